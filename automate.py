@@ -11,32 +11,69 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+import re
 import sys
+import uuid
+import socket
+import struct
 import argparse
+import selectors
 
-from xml.etree import ElementTree as ET
-from time import sleep
+from xml.parsers import expat
+from functools import lru_cache
+from collections.abc import Callable
+from time import monotonic, sleep, time
 from datetime import (
     datetime,
     timedelta,
     timezone
 )
 
-import ntplib
 import adbutils
 from adbutils.errors import (
     AdbError, AdbConnectionError
 )
 
 TARGET_TEXT = "Apply for unlocking"
+TARGET_RESOURCE_ID = "com.mi.global.bbs:id/btnApply"
 TARGET_TIME_STR = "23:59:59.800"
 TARGET_TIMEZONE_LIVE = timedelta(hours=8)
-NTP_SERVER = "pool.ntp.org"
-
-DEVICE_XML_PATH = "/sdcard/.ui_dump.xml"
-LOCAL_XML_PATH = ".ui_dump.xml"
+NTP_SERVERS = (
+    "pool.ntp.org",
+    "time.google.com",
+    "time.cloudflare.com",
+    "time.nist.gov",
+)
+NTP_PORT = 123
+NTP_TIMEOUT = 0.5
+SPIN_MARGIN = 0.002
+
+SHELL_TIMEOUT = 30.0
+TAP_FAILED_MARKER = "__MIUNLOCK_TAP_FAILED__"
+UI_DUMP_START_TAGS = (b"<?xml", b"<hierarchy")
+UI_DUMP_END_TAG = b"</hierarchy>"
+DEVICE_TAP_SCRIPT = "/data/local/tmp/.tap.sh"
 ADB_STAY_ON_KEY = "stay_on_while_plugged_in"
 
+# Prefix of the unique marker echoed after every command sent through the persistent shell
+_SHELL_END_MARKER_PREFIX = "__MIUNLOCK_SHELL_END_"
+
+# Seconds between the NTP epoch (1900) and the Unix epoch (1970)
+NTP_EPOCH_DELTA = 2208988800
+# SNTP client request up to the transmit timestamp: LI=0, VN=3, Mode=3, rest zeroed
+_NTP_REQUEST_HEADER = b"\x1b" + 39 * b"\0"
+
+# Matches element bounds in the "[x1,y1][x2,y2]" format
+_BOUNDS_RE = re.compile(r"\[(\d+),(\d+)\]\[(\d+),(\d+)\]")
+# Matches lines of `getevent -pl` and `wm size` output
+_INPUT_DEVICE_RE = re.compile(r"add device \d+: (\S+)")
+_ABS_MT_RANGE_RE = re.compile(r"ABS_MT_POSITION_([XY])\s*:.*\bmin (-?\d+), max (-?\d+)")
+_DISPLAY_SIZE_RE = re.compile(r"size: (\d+)x(\d+)")
+
+
+class _ElementFound(Exception):
+    """Raised from the expat handler to stop parsing at the target node."""
+
 
 class MiUnlocker:
     """
@@ -52,7 +89,9 @@ class MiUnlocker:
 
         self.device: adbutils.AdbDevice | None = None
         self.original_timeout: str | None = None
-        self.shell_conn = None
+        self.shell_conn: adbutils.AdbConnection | None = None
+        self.tap_command: str | None = None
+        self.pending_end_line: bytes | None = None
 
         self._connect_device()
 
@@ -62,24 +101,61 @@ class MiUnlocker:
         assert self.device is not None, "Device not connected"
 
         try:
-            self.original_timeout = self.device.shell(
-                "settings get system screen_off_timeout"
-            ).strip()
+            # Every later command goes through this one shell, no new transports
+            self.shell_conn = self.device.shell("sh", stream=True)
+
+            # Read the old timeout and apply new settings in a single round trip
+            output = self._sh(
+                "settings get system screen_off_timeout; "
+                f"settings put global {ADB_STAY_ON_KEY} 3; "
+                "settings put system screen_off_timeout 2147483647"
+            ).decode(errors="replace").strip()
+            self.original_timeout = output.splitlines()[0].strip() if output else None
 
             if not self.original_timeout or "null" in self.original_timeout:
                 self.original_timeout = "60000"
 
-            self.device.shell(f"settings put global {ADB_STAY_ON_KEY} 3")
-            self.device.shell("settings put system screen_off_timeout 2147483647")
-
             print(f"[+] Screen set to stay on. Original timeout: {self.original_timeout} ms.")
-        except AdbError as e:
+        except (AdbError, OSError) as e:
             print(f"[-] ADB error during screen setup: {e}")
             sys.exit(1)
 
         return self
 
 
+    def _sh(self, command: str, timeout: float = SHELL_TIMEOUT) -> bytes:
+        """Runs command through the persistent device shell and returns its raw output."""
+        assert self.shell_conn is not None, "Shell not opened"
+
+        # A fresh marker per call, so leftovers of a failed command can't end this one
+        marker = f"{_SHELL_END_MARKER_PREFIX}{uuid.uuid4().hex}"
+        end_line = f"{marker}\n".encode()
+
+        stale_end_line = self.pending_end_line
+        # Stays pending until the output is consumed through our own marker line
+        self.pending_end_line = end_line
+
+        sock = self.shell_conn.conn
+        sock.settimeout(timeout)
+        sock.sendall(f"{command}\necho {marker}\n".encode())
+
+        output = b""
+        while (end := output.find(end_line)) == -1:
+            chunk = sock.recv(65536)
+            if not chunk:
+                raise AdbError("Device shell closed unexpectedly")
+            output += chunk
+
+        self.pending_end_line = None
+        output = output[:end]
+
+        # Drop what was left over from an earlier command that failed midway
+        if stale_end_line is not None and (stale := output.rfind(stale_end_line)) != -1:
+            output = output[stale + len(stale_end_line):]
+
+        return output
+
+
     def _connect_device(self) -> None:
         """Connects to the first available ADB device."""
         try:
@@ -97,102 +173,362 @@ class MiUnlocker:
 
 
     @staticmethod
-    def _find_center_coordinates(xml_file_path: str, target_text: str) -> tuple[int, int] | None:
-        """Parses XML file to find element center coordinates."""
+    def _find_center_coordinates(xml_source: bytes | str,
+                                 target_text: str) -> tuple[int, int] | None:
+        """Streams XML dump (raw bytes or file path) to find element center coordinates."""
         print(f"[*] Parsing XML for element with text: '{target_text}'")
+
+        fallback_bounds = None
+
+        # Text match wins and stops the parse, first ID match is kept as fallback
+        def start_element(name: str, attrs: dict[str, str]) -> None:
+            nonlocal fallback_bounds
+            if name != "node":
+                return
+            if attrs.get("text") == target_text:
+                raise _ElementFound(attrs.get("bounds"))
+            if fallback_bounds is None and attrs.get("resource-id") == TARGET_RESOURCE_ID:
+                fallback_bounds = attrs.get("bounds")
+
+        # SAX-style pass over attributes only, no element tree is ever built
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = start_element
+
         try:
-            tree = ET.parse(xml_file_path)
-            root = tree.getroot()
-            element = root.find(f".//node[@text='{target_text}']")
-
-            if element is None:
-                # Fallback to ID if text not found
-                element = root.find(".//node[@resource-id='com.mi.global.bbs:id/btnApply']")
-            if element is None:
-                return None
-
-            bounds_str = element.get("bounds")
-            if bounds_str is None:
-                return None
-
-            # Parse bounds "[x1,y1][x2,y2]"
-            coords = bounds_str.replace("[", "").replace("]", ",").split(",")[:-1]
-            x1, y1, x2, y2 = map(int, coords)
-            center_x, center_y = (x1 + x2) // 2, (y1 + y2) // 2
-
-            print(f"[+] Found element bounds: {bounds_str}")
-            print(f"[+] Calculated center coordinates: ({center_x}, {center_y})")
-
-            return center_x, center_y
-        except (ET.ParseError, ValueError, AttributeError, TypeError) as e:
+            if isinstance(xml_source, (bytes, bytearray)):
+                parser.Parse(xml_source, True)
+            else:
+                with open(xml_source, "rb") as xml_file:
+                    parser.ParseFile(xml_file)
+            bounds_str = fallback_bounds
+        except _ElementFound as found:
+            bounds_str = found.args[0]
+        except (expat.ExpatError, OSError) as e:
             print(f"[-] Error parsing XML: {e}")
             return None
 
+        if bounds_str is None:
+            return None
+
+        return MiUnlocker._bounds_center(bounds_str)
+
+
+    @staticmethod
+    def _bounds_center(bounds_str: str) -> tuple[int, int] | None:
+        """Calculates center coordinates of "[x1,y1][x2,y2]" element bounds."""
+        match = _BOUNDS_RE.match(bounds_str)
+        if match is None:
+            return None
+
+        x1, y1, x2, y2 = map(int, match.groups())
+        center_x, center_y = (x1 + x2) // 2, (y1 + y2) // 2
+
+        print(f"[+] Found element bounds: {bounds_str}")
+        print(f"[+] Calculated center coordinates: ({center_x}, {center_y})")
+
+        return center_x, center_y
+
 
     def setup_ui_dump_and_find_coords(self) -> tuple[int, int] | None:
         """Dumps UI XML from device and finds target coordinates."""
-        assert self.device is not None, "Device not connected"
-
         try:
-            self.device.shell(f"uiautomator dump {DEVICE_XML_PATH}")
-            self.device.sync.pull(DEVICE_XML_PATH, LOCAL_XML_PATH)
-            print(f"[+] Successfully pulled UI dump to {LOCAL_XML_PATH}")
-            return self._find_center_coordinates(LOCAL_XML_PATH, TARGET_TEXT)
-        except AdbError as e:
+            # Stream the dump straight from stdout, nothing touches the disk
+            output = self._sh("uiautomator dump /dev/stdout")
+
+            # stderr is merged into the stream, so warnings may come before the document
+            # and uiautomator appends a status line after it
+            start = next(
+                (found for tag in UI_DUMP_START_TAGS if (found := output.find(tag)) != -1), 0
+            )
+            end = output.rfind(UI_DUMP_END_TAG)
+            end = end + len(UI_DUMP_END_TAG) if end != -1 else len(output)
+            xml_data = output[start:end]
+            print(f"[+] Successfully read UI dump ({len(xml_data)} bytes)")
+            return self._find_center_coordinates(xml_data, TARGET_TEXT)
+        except (AdbError, OSError) as e:
             print(f"[-] ADB error during UI dump: {e}")
             return None
 
 
+    @staticmethod
+    def _find_touchscreen(
+        getevent_output: str
+    ) -> tuple[str, tuple[int, int], tuple[int, int]] | None:
+        """Finds the protocol B multi-touch input device and its X/Y axis (min, max) ranges."""
+        axis_ranges: dict[str, dict[str, tuple[int, int]]] = {}
+        slotted_devices = set()
+        device_path = None
+
+        for line in getevent_output.splitlines():
+            if match := _INPUT_DEVICE_RE.search(line):
+                device_path = match.group(1)
+                axis_ranges[device_path] = {}
+            elif device_path is None:
+                continue
+            elif match := _ABS_MT_RANGE_RE.search(line):
+                axis_ranges[device_path][match.group(1)] = (
+                    int(match.group(2)), int(match.group(3))
+                )
+            elif "ABS_MT_SLOT" in line:
+                slotted_devices.add(device_path)
+
+        # The staged events use slots, which type A devices don't understand
+        for path, ranges in axis_ranges.items():
+            if path in slotted_devices and {"X", "Y"} <= ranges.keys():
+                return path, ranges["X"], ranges["Y"]
+
+        return None
+
+
+    def _locate_touch_point(self, center_x: int, center_y: int) -> tuple[str, int, int] | None:
+        """Maps display coordinates onto the touchscreen device axes."""
+        output = self._sh("getevent -pl 2>/dev/null; wm size").decode(errors="replace")
+        touchscreen = self._find_touchscreen(output)
+        display_sizes = _DISPLAY_SIZE_RE.findall(output)
+        if touchscreen is None or not display_sizes:
+            return None
+
+        # Last reported size is the override one, if any
+        device_path, (min_x, max_x), (min_y, max_y) = touchscreen
+        width, height = map(int, display_sizes[-1])
+        raw_x = min_x + center_x * (max_x - min_x + 1) // width
+        raw_y = min_y + center_y * (max_y - min_y + 1) // height
+
+        return device_path, raw_x, raw_y
+
+
+    def stage_tap(self, center_x: int, center_y: int) -> None:
+        """Pushes a raw sendevent tap script to the device, if the touchscreen is writable."""
+        try:
+            touch_point = self._locate_touch_point(center_x, center_y)
+            if touch_point is None:
+                print("[*] Touchscreen not detected, falling back to `cmd input tap`.")
+                return
+
+            device_path, raw_x, raw_y = touch_point
+
+            # EV_ABS: ABS_MT_SLOT, ABS_MT_TRACKING_ID, ABS_MT_POSITION_X/Y,
+            # EV_KEY: BTN_TOUCH, EV_SYN: SYN_REPORT
+            events = [
+                "3 47 0", "3 57 1", f"3 53 {raw_x}", f"3 54 {raw_y}", "1 330 1", "0 0 0",
+                "3 57 -1", "1 330 0", "0 0 0",
+            ]
+            # Bail out on the first failed write so the caller can fall back
+            script = "\n".join(
+                ["set -e", *(f"sendevent {device_path} {event}" for event in events)]
+            )
+
+            output = self._sh(
+                f"[ -w {device_path} ] && cat > {DEVICE_TAP_SCRIPT} <<'EOF' && echo staged\n"
+                f"{script}\nEOF"
+            )
+            if b"staged" not in output:
+                print(f"[*] {device_path} is not writable, falling back to `cmd input tap`.")
+                return
+
+            self.tap_command = f"sh {DEVICE_TAP_SCRIPT}"
+            print(f"[+] Staged sendevent tap on {device_path} at ({raw_x}, {raw_y}).")
+        except (AdbError, OSError) as e:
+            print(f"[-] ADB error while staging tap, falling back to `cmd input tap`: {e}")
+
+
+    def prewarm(self) -> None:
+        """Runs the tap tools once so they are resident in page cache at the deadline."""
+        try:
+            # KEYCODE_UNKNOWN is ignored by the system, bare sendevent only prints usage
+            self._sh("{ cmd input keyevent 0; sendevent; } >/dev/null 2>&1", timeout=2.0)
+        except (AdbError, OSError) as e:
+            print(f"[-] ADB error while pre-warming tap tools: {e}")
+
+
+    def _run_click_batch(self, command_batch: str, timeout: float) -> tuple[bytes, float]:
+        """Runs the click batch, returns its output and the time it was sent."""
+        fired_at = time()
+        try:
+            return self._sh(command_batch, timeout=timeout), fired_at
+        except (AdbError, OSError) as e:
+            # The persistent shell may have dropped while idle, retry once on a fresh transport
+            assert self.device is not None, "Device not connected"
+            fired_at = time()
+            output = self.device.shell(command_batch, timeout=timeout, encoding=None)
+            print(f"[*] Persistent shell failed ({e}), clicked over a fresh ADB shell.")
+            return output, fired_at
+
+
     def execute_clicks(self, center_x: int, center_y: int, num_clicks: int,
                        click_delay: float, target_tz_offset: timedelta) -> None:
         """Executes the click sequence at target time."""
-        assert self.device is not None, "Device not connected"
-
-        execution_time = get_ntp_time() + target_tz_offset
-        print(
-            f"Executing: [adb shell input tap {center_x} {center_y}] at "
-            f"{execution_time.strftime("%H:%M:%S.%f")}"
-        )
+        # Staged sendevent script skips the input service entirely, `cmd input`
+        # at least avoids spawning app_process for Input.java and backs the script up
+        tap_command = f"cmd input tap {center_x} {center_y}"
+        if self.tap_command:
+            tap_command = f"{{ {self.tap_command} || {tap_command}; }}"
 
         try:
             # Build all tap commands as a single batch to minimize latency
             shell_commands = []
             for click_num in range(num_clicks):
-                shell_commands.append(f"input tap {center_x} {center_y}")
+                shell_commands.append(f"{tap_command} || echo {TAP_FAILED_MARKER}")
                 if click_num < num_clicks - 1:
                     shell_commands.append(f"sleep {click_delay}")
 
-            command_batch = "; ".join(shell_commands)
-            self.device.shell(command_batch)
-
-            print("[SUCCESS] Click sequence completed.")
-        except AdbError as e:
+            output, fired_at = self._run_click_batch(
+                "; ".join(shell_commands), SHELL_TIMEOUT + num_clicks * click_delay
+            )
+
+            # Query NTP and print only once the taps are out, not at the deadline
+            offset = ntp_offset()
+            execution_time = datetime.fromtimestamp(
+                fired_at + (offset or 0.0), tz=timezone.utc
+            ) + target_tz_offset
+            print(
+                f"Executed: [adb shell {tap_command}] at "
+                f"{execution_time.strftime('%H:%M:%S.%f')}"
+            )
+            if TAP_FAILED_MARKER.encode() in output:
+                print(f"[-] Some taps failed: {output.decode(errors='replace').strip()}")
+            else:
+                print("[SUCCESS] Click sequence completed.")
+        except (AdbError, OSError) as e:
             print(f"[-] ADB error during click execution: {e}")
 
 
     def __exit__(self, _exc_type, _exc_value, _traceback):
-        """Restores original settings and cleans up temp files."""
-        assert self.device is not None, "Device not connected"
-
+        """Restores original settings, removes the tap script and closes the device shell."""
         try:
+            shell_commands = [f"rm -f {DEVICE_TAP_SCRIPT}"]
             if self.original_timeout:
-                self.device.shell(f"settings put system screen_off_timeout {self.original_timeout}")
-                self.device.shell(f"settings put global {ADB_STAY_ON_KEY} 0")
-                print(f"[+] Restored screen_off_timeout to {self.original_timeout}.")
+                shell_commands.append(
+                    f"settings put system screen_off_timeout {self.original_timeout}"
+                )
+                shell_commands.append(f"settings put global {ADB_STAY_ON_KEY} 0")
+
+            # Restore settings and remove the tap script in a single round trip,
+            # on a fresh shell if the persistent one may still be busy with a failed command
+            if self.pending_end_line is None:
+                self._sh("; ".join(shell_commands))
+            else:
+                assert self.device is not None, "Device not connected"
+                self.device.shell("; ".join(shell_commands))
 
-            self.device.shell(f"rm -f {DEVICE_XML_PATH}")
-            print("[+] Removed the temporary file from the device.")
-        except AdbError as e:
+            if self.original_timeout:
+                print(f"[+] Restored screen_off_timeout to {self.original_timeout}.")
+        except (AdbError, OSError) as e:
             print(f"[-] ADB error during cleanup: {e}")
+        finally:
+            if self.shell_conn is not None:
+                self.shell_conn.close()
 
 
-def get_ntp_time(server: str = NTP_SERVER) -> datetime:
-    """Fetches current time from NTP server (UTC)."""
+@lru_cache(maxsize=None)
+def _ntp_endpoint(server: str) -> tuple[socket.socket, tuple[str, int]] | None:
+    """Resolves NTP server once and opens a reusable UDP socket for it, None if unusable."""
+    # Failures are cached too, so a dead server never costs another blocking DNS lookup
     try:
-        response = ntplib.NTPClient().request(server, version=3)
-        return datetime.fromtimestamp(response.tx_time, tz=timezone.utc)
-    except (OSError, ImportError):
-        return datetime.now(timezone.utc)
+        addr = socket.getaddrinfo(server, NTP_PORT, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    except OSError:
+        return None
+
+    sock.setblocking(False)
+    return sock, addr
+
+
+def _ntp_timestamp(data: bytes, offset: int) -> float:
+    """Decodes a 64-bit NTP timestamp at offset into Unix seconds."""
+    secs, frac = struct.unpack_from("!II", data, offset)
+    return secs - NTP_EPOCH_DELTA + frac / 2**32
+
+
+def _send_ntp_request(sock: socket.socket, addr: tuple[str, int]) -> tuple[bytes, float]:
+    """Sends an SNTP request, returns its transmit timestamp and send time."""
+    orig_time = time()
+    ntp_time = orig_time + NTP_EPOCH_DELTA
+    transmit = struct.pack("!II", int(ntp_time), int(ntp_time % 1 * 2**32))
+    sock.sendto(_NTP_REQUEST_HEADER + transmit, addr)
+
+    return transmit, orig_time
+
+
+def _parse_ntp_reply(data: bytes, transmit: bytes, orig_time: float,
+                     dest_time: float) -> tuple[float, float] | None:
+    """Returns (offset, round-trip delay) of an SNTP reply, None if it isn't usable."""
+    # Server echoes our transmit timestamp, skip late replies to earlier requests
+    if len(data) < 48 or data[24:32] != transmit:
+        return None
+
+    # Skip non-server replies, Kiss-o'-Death (stratum 0), unsynchronized clocks (LI=3)
+    # and replies without a transmit timestamp
+    leap, mode, stratum = data[0] >> 6, data[0] & 0x7, data[1]
+    if mode != 4 or stratum == 0 or leap == 3 or data[40:48] == bytes(8):
+        return None
+
+    recv_time = _ntp_timestamp(data, 32)
+    tx_time = _ntp_timestamp(data, 40)
+
+    # Four-timestamp correction cancels out the symmetric part of the network delay
+    offset = ((recv_time - orig_time) + (tx_time - dest_time)) / 2
+    delay = (dest_time - orig_time) - (tx_time - recv_time)
+    return offset, delay
+
+
+def _collect_ntp_samples(
+    endpoints: list[tuple[socket.socket, tuple[str, int]]]
+) -> list[tuple[float, float]]:
+    """Queries all endpoints at once, returns (offset, round-trip delay) of every reply."""
+    samples = []
+
+    with selectors.DefaultSelector() as selector:
+        for sock, addr in endpoints:
+            try:
+                transmit, orig_time = _send_ntp_request(sock, addr)
+                selector.register(sock, selectors.EVENT_READ, (transmit, orig_time))
+            except OSError:
+                continue
+
+        deadline = monotonic() + NTP_TIMEOUT
+        while selector.get_map() and (remaining := deadline - monotonic()) > 0:
+            for key, _ in selector.select(remaining):
+                try:
+                    data, _ = key.fileobj.recvfrom(48)
+                except OSError:
+                    selector.unregister(key.fileobj)
+                    continue
+
+                sample = _parse_ntp_reply(data, *key.data, time())
+                if sample is not None:
+                    samples.append(sample)
+                    selector.unregister(key.fileobj)
+
+    return samples
+
+
+def ntp_offset(servers: tuple[str, ...] = NTP_SERVERS) -> float | None:
+    """Measures local clock offset in seconds against the closest NTP server, None on failure."""
+    endpoints = [
+        endpoint for server in servers if (endpoint := _ntp_endpoint(server)) is not None
+    ]
+    if not endpoints:
+        return None
+
+    # Keep the reply with the lowest round trip
+    samples = _collect_ntp_samples(endpoints)
+    if samples:
+        return min(samples, key=lambda sample: sample[1])[0]
+
+    # Last resort, only imported when the hand-rolled exchange got no replies
+    try:
+        import ntplib  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    try:
+        # ntplib applies the same four-timestamp correction, reuse the resolved address
+        host = endpoints[0][1][0]
+        return ntplib.NTPClient().request(host, version=3, timeout=NTP_TIMEOUT).offset
+    except (OSError, ntplib.NTPException):
+        return None
 
 
 def validate_and_format_test_time(test_time: str) -> str | None:
@@ -224,35 +560,30 @@ def setup_timezone(args) -> tuple[str, timedelta]:
 
 
 def calculate_target_time(target_time_str: str, current_time_utc: datetime,
-                          target_tz_offset: timedelta) -> tuple[datetime, datetime]:
-    """Calculates target click time in UTC."""
-    current_time_target_tz = current_time_utc + target_tz_offset
+                          target_tz_offset: timedelta) -> tuple[datetime, float]:
+    """Calculates target click time in target timezone and as a Unix timestamp."""
+    target_tz = timezone(target_tz_offset)
+    current_time_target_tz = current_time_utc.astimezone(target_tz)
     target_time_naive = datetime.strptime(target_time_str, "%H:%M:%S.%f").time()
 
     target_dt_target_tz = datetime.combine(
         current_time_target_tz.date(),
         target_time_naive,
-        tzinfo=current_time_target_tz.tzinfo
+        tzinfo=target_tz
     )
-    target_dt_utc = target_dt_target_tz - target_tz_offset
 
     # If target time has passed today, move to tomorrow
     if current_time_target_tz >= target_dt_target_tz:
-        tomorrow = current_time_target_tz.date() + timedelta(days=1)
-        target_dt_target_tz = datetime.combine(
-            tomorrow,
-            target_time_naive,
-            tzinfo=current_time_target_tz.tzinfo
-        )
-        target_dt_utc = target_dt_target_tz - target_tz_offset
+        target_dt_target_tz += timedelta(days=1)
 
-    return target_dt_target_tz, target_dt_utc
+    return target_dt_target_tz, target_dt_target_tz.timestamp()
 
 
-def wait_and_sync_to_target(target_dt_utc: datetime) -> bool:
-    """Waits and synchronizes to target time."""
-    current_time_utc = get_ntp_time()
-    time_to_wait_sec = (target_dt_utc - current_time_utc).total_seconds()
+def wait_and_sync_to_target(target_ts: float, offset: float,
+                            prewarm: Callable[[], None] | None = None) -> bool:
+    """Waits and synchronizes to target time, calling prewarm shortly before it."""
+    # Follow the local clock corrected by the offset measured at startup
+    time_to_wait_sec = target_ts - (time() + offset)
 
     if time_to_wait_sec < 0:
         print("[-] Please run the script closer to the target time.")
@@ -265,17 +596,24 @@ def wait_and_sync_to_target(target_dt_utc: datetime) -> bool:
         print(f"[*] Waiting for {pre_wait_time:.3f} seconds before final synchronization...")
         sleep(pre_wait_time)
 
-    while True:
-        current_time_utc = get_ntp_time()
-        remaining_sec = (target_dt_utc - current_time_utc).total_seconds()
-        if remaining_sec <= 0:
-            break
-        if remaining_sec < 1.0:
-            print(f"[*] Sleeping for final {remaining_sec:.6f} seconds...")
-            sleep(remaining_sec)
-            break
-        print(f"[*] {remaining_sec:.3f} seconds remaining.")
-        sleep(0.5)
+        if prewarm is not None:
+            prewarm()
+
+        # The local clock may have drifted during the wait, keep the old offset on failure
+        if (new_offset := ntp_offset()) is not None:
+            offset = new_offset
+
+    deadline = monotonic() + (target_ts - (time() + offset))
+
+    # Keep stdout writes out of the last couple of seconds
+    remaining_sec = deadline - monotonic()
+    if remaining_sec >= 2.0:
+        print(f"[*] Sleeping for final {remaining_sec:.6f} seconds...")
+
+    # Sleep coarsely, then spin through the last bit to dodge timer granularity
+    sleep(max(0.0, deadline - monotonic() - SPIN_MARGIN))
+    while monotonic() < deadline:
+        pass
 
     return True
 
@@ -333,10 +671,18 @@ def main() -> None:
             return
 
         center_x, center_y = click_coords
+        unlocker.stage_tap(center_x, center_y)
 
         target_time_str, target_tz_offset = setup_timezone(args)
-        current_time_utc = get_ntp_time()
-        target_dt_target_tz, target_dt_utc = calculate_target_time(
+
+        # Measure once here and reuse it, servers rate-limit back-to-back queries
+        offset = ntp_offset()
+        if offset is None:
+            print("[-] NTP servers unreachable, using the local clock.")
+            offset = 0.0
+
+        current_time_utc = datetime.fromtimestamp(time() + offset, tz=timezone.utc)
+        target_dt_target_tz, target_ts = calculate_target_time(
             target_time_str,
             current_time_utc,
             target_tz_offset
@@ -346,7 +692,7 @@ def main() -> None:
             target_dt_target_tz.strftime("%Y-%m-%d %H:%M:%S")
         )
 
-        if not wait_and_sync_to_target(target_dt_utc):
+        if not wait_and_sync_to_target(target_ts, offset, unlocker.prewarm):
             return
 
         unlocker.execute_clicks(